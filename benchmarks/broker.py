@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+CLIENTS processes that each need all feature values: lines received by the device and time until
+each client is synchronised, with direct connections and through a broker
+"""
+
+import time
+from threading import Event
+from hificon import Target
+
+
+CLIENTS = 3
+
+
+def synchronise(uri):
+    """ Connects to @uri and returns the seconds until all features have been answered """
+    target = Target(uri)
+    target.preload_features.update(target.features.keys())
+    synced = Event()
+    target.bind(on_synced=lambda *_: synced.set())
+    t = time.perf_counter()
+    with target:
+        synced.wait()
+        return time.perf_counter()-t
+
+
+if __name__ == "__main__":
+    with Target("denon://127.0.0.1:0", role="dummyserver") as device:
+        received = []
+        device.bind(on_receive_raw_data=received.append)
+        uri = f"denon://127.0.0.1:{device.port}"
+        seconds = [synchronise(uri) for _ in range(CLIENTS)]
+        print(f"direct: {len(received)} lines to the device, "
+            f"synchronised in {', '.join('%.2f s'%s for s in seconds)}")
+        received.clear()
+        broker = Target(f"broker:{uri}", role="server")
+        synced = Event()
+        broker._client.bind(on_synced=lambda *_: synced.set())
+        with broker:
+            synced.wait()
+            lines = len(received)
+            seconds = [synchronise(f"broker:{uri}") for _ in range(CLIENTS)]
+        print(f"broker: {len(received)} lines to the device ({lines} for the broker's own preload), "
+            f"synchronised in {', '.join('%.2f s'%s for s in seconds)}")
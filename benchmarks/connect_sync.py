@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Time from connecting until all features in preload_features have been answered
+"""
+
+import time
+from threading import Event
+from hificon import Target
+
+
+URI = "dummyemulate:denon"
+
+
+if __name__ == "__main__":
+    target = Target(URI)
+    target.preload_features.update(target.features.keys())
+    synced = Event()
+    result = {}
+    target.bind(on_synced=lambda done, total: (result.update(done=done, total=total), synced.set()))
+    t = time.perf_counter()
+    with target:
+        synced.wait()
+        seconds = time.perf_counter()-t
+        print(f"{URI}: {result['done']}/{result['total']} features synchronised in {seconds:.2f} s, "
+            f"{target.polls_sent} requests sent, {target.polls_saved} saved")
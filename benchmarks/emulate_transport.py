@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Messages between the client and server of dummyemulate: time until the server received MESSAGES lines,
+number of lines received out of order and number of threads started
+"""
+
+import time, threading
+from hificon import Target
+from hificon.core.transmission.abstract import AbstractServer
+
+
+MESSAGES = 5000
+
+
+if __name__ == "__main__":
+    started = 0
+    start = threading.Thread.start
+    def count_start(self):
+        global started
+        started += 1
+        return start(self)
+    threading.Thread.start = count_start
+    received = []
+    on_receive_raw_data = AbstractServer.on_receive_raw_data
+    def record(self, data):
+        received.append(data)
+        return on_receive_raw_data(self, data)
+    AbstractServer.on_receive_raw_data = record
+    with Target("dummyemulate:denon") as target:
+        time.sleep(1)
+        received.clear()
+        started = 0
+        t = time.perf_counter()
+        for i in range(MESSAGES): target.send(f"ZZ{i}")
+        while len([l for l in received if l.startswith("ZZ")]) < MESSAGES and time.perf_counter()-t < 30: time.sleep(.001)
+        seconds = time.perf_counter()-t
+        order = [int(line[2:]) for line in received if line.startswith("ZZ")]
+        unordered = sum(1 for a, b in zip(order, order[1:]) if b < a)
+        print(f"{MESSAGES} messages: received {len(order)} in {seconds*1000:.0f} ms, "
+            f"{unordered} out of order, {started} threads started")
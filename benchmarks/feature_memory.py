@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Memory footprint of the feature objects of one target, measured with tracemalloc
+"""
+
+import tracemalloc, gc
+from threading import Event
+from hificon import Target
+
+
+URI = "denon"
+
+
+if __name__ == "__main__":
+    Target(URI, role="dummyserver").features.values() # warm up
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    target = Target(URI, role="dummyserver")
+    features = target.features.values()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    events = sum(isinstance(v, Event) for f in features for v in vars(f).values())
+    print(f"{URI}: {len(features)} features, {(after-before)/1024:.0f} KiB per target, "
+        f"{(after-before)/len(features):.0f} B per feature, {events} Event objects")
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Number of requests that are being sent when refreshing all features of a target
+"""
+
+import time
+from hificon import Target
+
+
+URI = "dummyemulate:denon"
+
+
+if __name__ == "__main__":
+    with Target(URI) as target:
+        features = target.features.values()
+        target.features.wait_for("power")
+        sent, saved = target.polls_sent, target.polls_saved
+        for f in features:
+            try: f.async_poll(force=True)
+            except ConnectionError: pass
+        time.sleep(1)
+        sent, saved = target.polls_sent-sent, target.polls_saved-saved
+        calls = len({f.call for f in features if f.call})
+        print(f"{URI}: {len(features)} features with {calls} distinct calls. "
+            f"Forced poll of all features sent {sent} requests, saved {saved}.")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Events and requests caused by a dropped connection, with and without stale_while_revalidate.
+PRELOAD features are being preloaded, OBSERVED features have an on_change callback and OTHER
+features have been read once.
+"""
+
+import time
+from threading import Event
+from hificon import Target
+from hificon.core.transmission.abstract import GroupedSet
+
+
+def session(uri, stale_while_revalidate):
+    time.sleep(1.1) # the server answers the same request only once per second
+    target = Target(uri, stale_while_revalidate=stale_while_revalidate)
+    ids = sorted(f_id for f_id, f in target.features.items() if f.call is not None)
+    preload, observed, other = ids[:10], ids[10:40], ids[40:60]
+    target.preload_features.update(preload+observed+other)
+    synced = Event()
+    target.bind(on_synced=lambda *_: synced.set())
+    counts = dict(unset=0, change=0)
+    with target:
+        synced.wait()
+        target.preload_features = GroupedSet(preload)
+        for f_id in observed:
+            target.features[f_id].bind(
+                on_unset=lambda: counts.__setitem__("unset", counts["unset"]+1),
+                on_change=lambda *_: counts.__setitem__("change", counts["change"]+1))
+        time.sleep(1.1)
+        counts.update(unset=0, change=0) # bind() has called on_change
+        readable = []
+        target.bind(on_disconnected=lambda: readable.append(
+            sum(target.features[f_id].isset() for f_id in preload+observed+other)))
+        polls = target.polls_sent
+        synced.clear()
+        t = time.perf_counter()
+        target.disconnect() # the main loop reconnects
+        synced.wait()
+        resync = time.perf_counter()-t
+        polls = target.polls_sent-polls
+        stale = sum(target.features[f_id].isstale() for f_id in preload+observed+other)
+        events = dict(counts) # before exit() unsets the values
+        for f_id in other: target.features[f_id].get_wait() # revalidates stale values
+        stale_after_read = sum(target.features[f_id].isstale() for f_id in other)
+    return readable[0], events, polls, resync, stale, stale_after_read
+
+
+if __name__ == "__main__":
+    with Target("denon://127.0.0.1:0", role="dummyserver") as device:
+        uri = f"denon://127.0.0.1:{device.port}"
+        for mode in (False, True):
+            readable, counts, polls, resync, stale, stale_after_read = session(uri, mode)
+            print(f"stale_while_revalidate={mode}: {readable}/60 values readable while disconnected, "
+                f"{counts['unset']} unset and {counts['change']} change events on 30 observed features, "
+                f"{polls} polls, resynchronised after {resync*1000:.0f} ms, {stale} stale, "
+                f"{stale_after_read} stale after get_wait() on OTHER")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Polls from a downstream client to a repeater: how many lines reach the device and how long it takes
+until the client has received all answers, with and without caching
+"""
+
+import socket, time
+from threading import Event
+from hificon import Target
+
+
+POLLS = 500
+QUERIES = ["PW?", "SI?", "MU?", "ZM?"]
+
+
+if __name__ == "__main__":
+    for caching in (False, True):
+        repeater = Target("repeat:emulate:denon", role="server", caching=caching)
+        synced = Event()
+        repeater._client.bind(on_synced=lambda *_: synced.set())
+        with repeater:
+            synced.wait()
+            time.sleep(1)
+            received = []
+            repeater._client._server.bind(on_receive_raw_data=received.append)
+            sock = socket.create_connection((repeater.host, repeater.port))
+            sock.settimeout(1)
+            t = time.perf_counter()
+            sock.sendall("".join(f"{QUERIES[i%len(QUERIES)]}\r" for i in range(POLLS)).encode())
+            answers = 0
+            last = t
+            while answers < POLLS:
+                try: data = sock.recv(65536)
+                except socket.timeout: break
+                answers += data.count(b"\r")
+                last = time.perf_counter()
+            sock.close()
+            print(f"caching={caching}: {POLLS} polls, {sum(line in QUERIES for line in received)} "
+                f"forwarded to the device, {answers} answers in {(last-t)*1000:.0f} ms")
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Per call overhead of Target.schedule() when all required features are set.
+"before" registers a FunctionCall like Target.schedule() always did, "after" is Target.schedule().
+"""
+
+import timeit, tracemalloc
+from hificon import Target, features
+
+
+N = 20000
+
+
+def func(volume, power): pass
+
+
+def before(target):
+    features.FunctionCall(target, func, features=[target.features.volume, target.features.power])
+
+def after(target):
+    target.schedule(func, requires=("volume", "power"))
+
+
+def measure(f, target):
+    seconds = min(timeit.repeat(lambda: f(target), number=N, repeat=3))
+    tracemalloc.start()
+    for _ in range(1000): f(target)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds/N*1e6, peak
+
+
+if __name__ == "__main__":
+    with Target("dummyemulate:denon") as target:
+        target.features.wait_for("volume", "power")
+        for name, f in (("before", before), ("after", after)):
+            us, peak = measure(f, target)
+            print("%-8s %8.2f us/call  %8d B peak"%(name, us, peak))
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Latency of remote_set() while the client is busy with preloading all features after connecting
+"""
+
+import time
+from threading import Event
+from hificon import Target
+
+
+URI = "emulate:denon"
+
+
+if __name__ == "__main__":
+    target = Target(URI)
+    target.preload_features.update(target.features.keys())
+    with target:
+        target.features.volume.get_wait()
+        changed = Event()
+        target.features.volume.bind(on_change=lambda value: changed.set())
+        latencies = []
+        for value in range(30, 40):
+            changed.clear()
+            t = time.perf_counter()
+            target.features.volume.remote_set(value)
+            changed.wait(10)
+            latencies.append(time.perf_counter()-t)
+            time.sleep(.1)
+        print(f"{URI}: remote_set latency during preload: mean {sum(latencies)/len(latencies)*1000:.0f} ms, "
+            f"max {max(latencies)*1000:.0f} ms")
+        for priority, stats in target.send_stats().items():
+            print(f"  priority {priority}: {stats['sent']} sent, {stats['depth']} queued, "
+                f"wait mean {stats['wait_mean']*1000:.0f} ms, max {stats['wait_max']*1000:.0f} ms")
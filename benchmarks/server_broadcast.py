@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+TelnetServer broadcast: time until all clients received LINES lines and CPU usage of an idle server
+"""
+
+import socket, time
+from threading import Thread
+from hificon import Target
+
+
+CLIENTS = 50
+LINES = 5000
+
+
+def receive(sock, size, done):
+    received = 0
+    while received < size:
+        data = sock.recv(1<<16)
+        if not data: break
+        received += len(data)
+    done.append(received)
+
+
+if __name__ == "__main__":
+    with Target("telnet://127.0.0.1:0", role="dummyserver") as server:
+        socks = [socket.create_connection((server.host, server.port)) for _ in range(CLIENTS)]
+        for sock in socks: sock.sendall(b"\r")
+        time.sleep(.5)
+        cpu = time.process_time()
+        time.sleep(2)
+        idle_cpu = (time.process_time()-cpu)/2
+        line = "MV%03d"%0
+        size = LINES*(len(line)+1)
+        done = []
+        threads = [Thread(target=receive, args=(sock, size, done), daemon=True) for sock in socks]
+        for t in threads: t.start()
+        t = time.perf_counter()
+        for i in range(LINES): server.send(line)
+        for thread in threads: thread.join(max(0, t+60-time.perf_counter()))
+        seconds = time.perf_counter()-t
+        for sock in socks: sock.close()
+        print(f"{CLIENTS} clients: {LINES} lines broadcast in {seconds*1000:.0f} ms "
+            f"({len([r for r in done if r == size])} complete), idle server CPU {idle_cpu*100:.1f} %")
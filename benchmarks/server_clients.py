@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Many concurrent clients sending requests to a TelnetServer: requests per second and latency from
+the client's write until the target processed the line. Each client waits for its previous request.
+Compares the selector server with the asyncio server (use_asyncio=True).
+"""
+
+import asyncio, time
+from hificon import Target
+
+
+CLIENTS = (10, 100, 1000)
+SECONDS = 3
+
+
+async def run(server, clients):
+    loop = asyncio.get_running_loop()
+    waiting = {} # {line: (future, time sent)}
+    latencies = []
+    def on_receive_raw_data(data):
+        if data in waiting: loop.call_soon_threadsafe(done, data, time.perf_counter())
+    def done(data, t):
+        future, sent = waiting.pop(data)
+        latencies.append(t-sent)
+        future.set_result(None)
+    server.bind(on_receive_raw_data=on_receive_raw_data)
+    connections = [await asyncio.open_connection(server.host, server.port) for _ in range(clients)]
+    stop = time.perf_counter()+SECONDS
+    async def client(c, reader, writer):
+        i = 0
+        while time.perf_counter() < stop:
+            line = f"ZZ{c}.{i}"
+            future = loop.create_future()
+            waiting[line] = future, time.perf_counter()
+            writer.write(f"{line}\r".encode())
+            await future
+            i += 1
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c, *conn) for c, conn in enumerate(connections)))
+    seconds = time.perf_counter()-start
+    for reader, writer in connections: writer.close()
+    latencies.sort()
+    return len(latencies)/seconds, latencies[int(len(latencies)*.99)]
+
+
+if __name__ == "__main__":
+    for clients in CLIENTS:
+        for use_asyncio in (False, True):
+            with Target("denon://127.0.0.1:0", role="dummyserver", use_asyncio=use_asyncio) as server:
+                rate, p99 = asyncio.run(run(server, clients))
+            print(f"{'asyncio' if use_asyncio else 'selector'}, {clients} clients: "
+                f"{rate:.0f} req/s, p99 {p99*1000:.1f} ms")
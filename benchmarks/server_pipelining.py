@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Pipelining to a TelnetServer: send REQUESTS lines in one write and count how many of them
+reach the target intact
+"""
+
+import socket, time
+from hificon import Target
+
+
+REQUESTS = 5000
+QUERIES = ["PW?", "MV?", "SI?", "MU?", "MS?", "PSTONE CTRL ?", "SSINFAISFSV ?"]
+
+
+if __name__ == "__main__":
+    with Target("denon://127.0.0.1:0", role="dummyserver") as server:
+        received = []
+        server.bind(on_receive_raw_data=received.append)
+        sock = socket.create_connection((server.host, server.port))
+        time.sleep(.2)
+        lines = [QUERIES[i%len(QUERIES)] for i in range(REQUESTS)]
+        t = time.perf_counter()
+        sock.sendall("".join(f"{line}\r" for line in lines).encode())
+        while len(received) < REQUESTS and time.perf_counter()-t < 10: time.sleep(.01)
+        seconds = time.perf_counter()-t
+        intact = sum(1 for line in received if line in QUERIES)
+        print(f"{REQUESTS} pipelined lines: {intact} intact, {len(received)-intact} garbled, "
+            f"received in {seconds*1000:.0f} ms")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Reading the current volume from another process: a new client connection per read compared to
+SharedState.get() and a shm: target
+"""
+
+import time
+from threading import Event
+from hificon import Target, SharedStateWriter, SharedState
+
+
+READS = 100000
+
+
+if __name__ == "__main__":
+    with Target("denon://127.0.0.1:0", role="dummyserver") as device:
+        uri = f"denon://127.0.0.1:{device.port}"
+        with Target(uri) as target:
+            writer = SharedStateWriter(target)
+            target.features.volume.get_wait()
+            seconds = []
+            for _ in range(3):
+                time.sleep(1.1) # the server answers the same request only once per second
+                t = time.perf_counter()
+                with Target(uri) as client: client.features.volume.get_wait()
+                seconds.append(time.perf_counter()-t)
+            print(f"connection per read: {sum(seconds)/len(seconds)*1000:.1f} ms per read")
+
+            state = SharedState(uri)
+            t = time.perf_counter()
+            for _ in range(READS): state.get("volume")
+            print(f"SharedState.get(): {(time.perf_counter()-t)/READS*1e6:.2f} µs per read")
+
+            with Target(f"shm:{uri}") as client:
+                changed = Event()
+                client.features.volume.bind(on_change=lambda value: value == 30 and changed.set())
+                t = time.perf_counter()
+                target.features.volume.remote_set(30)
+                changed.wait()
+                print(f"shm: target: volume change observed after {(time.perf_counter()-t)*1000:.0f} ms")
+            writer.close()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Time and memory needed for constructing a target and for loading all of its features
+"""
+
+import time, tracemalloc, gc
+from hificon import Target
+
+
+URI = "emulate:denon"
+N = 10
+
+
+def construct():
+    t = time.perf_counter()
+    target = Target(URI)
+    return target, time.perf_counter()-t
+
+
+if __name__ == "__main__":
+    construct() # warm up imports and class creation
+    seconds = min(construct()[1] for _ in range(N))
+    gc.collect()
+    tracemalloc.start()
+    target, _ = construct()
+    memory = tracemalloc.get_traced_memory()[0]
+    for f_id in list(target.features.keys()): target.features[f_id]
+    memory_loaded = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{URI}: {seconds*1000:.1f} ms construction, {memory/1024:.0f} KiB after construction, "
+        f"{memory_loaded/1024:.0f} KiB with all {len(target.features)} client features loaded")
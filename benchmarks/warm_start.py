@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Time from starting a client until FEATURES can be read, without and with a ValueCache from the previous
+session, and until the restored values have been revalidated
+"""
+
+import time, tempfile, os
+from threading import Event
+from hificon import Target, ValueCache
+
+
+FEATURES = ["power", "volume", "muted", "source", "sound_mode"]
+
+
+def start(uri, path=None):
+    time.sleep(1.1) # the server answers the same request only once per second
+    target = Target(uri)
+    target.preload_features.update(FEATURES)
+    synced = Event()
+    target.bind(on_synced=lambda *_: synced.set())
+    t = time.perf_counter()
+    if path: ValueCache(target, path)
+    with target:
+        while not all(target.features[f_id].isset() for f_id in FEATURES): time.sleep(.001)
+        available = time.perf_counter()-t
+        synced.wait()
+        stale = sum(target.features[f_id].isstale() for f_id in FEATURES)
+        revalidated = time.perf_counter()-t
+    return available, revalidated, stale
+
+
+if __name__ == "__main__":
+    path = os.path.join(tempfile.mkdtemp(), "values.json")
+    with Target("denon://127.0.0.1:0", role="dummyserver") as device:
+        uri = f"denon://127.0.0.1:{device.port}"
+        available, revalidated, stale = start(uri)
+        print(f"cold start: values available after {available*1000:.1f} ms")
+        start(uri, path) # fill the cache
+        available, revalidated, stale = start(uri, path)
+        print(f"warm start: values available after {available*1000:.1f} ms, "
+            f"revalidated after {revalidated*1000:.0f} ms, {stale} still stale")
+        print(f"cache size: {os.path.getsize(path)} bytes")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Scroll wheel simulation: Many volume.remote_set() calls in a short time.
+Counts the commands that are being sent and measures the time until the last value has been applied.
+"write_timeout=None" sends each value, like remote_set() did before coalescing.
+"""
+
+import time
+from decimal import Decimal
+from threading import Event
+from hificon import Target
+
+
+URI = "emulate:denon"
+STEPS = 100
+INTERVAL = .005 # seconds between two remote_set() calls
+
+
+def scroll(target, write_timeout):
+    volume = target.features.volume
+    volume.write_timeout = write_timeout
+    volume.remote_set(Decimal(20))
+    time.sleep(1)
+    sent = []
+    binding = target.bind(send=sent.append)
+    done = Event()
+    final = Decimal(20)+STEPS*Decimal(".5")
+    volume.bind(on_change=lambda value: value == final and done.set())
+    t = time.perf_counter()
+    for i in range(1, STEPS+1):
+        volume.remote_set(Decimal(20)+i*Decimal(".5"))
+        time.sleep(INTERVAL)
+    done.wait(30)
+    latency = time.perf_counter()-t-STEPS*INTERVAL
+    binding.unbind()
+    return len([cmd for cmd in sent if cmd.startswith("MV")]), latency
+
+
+if __name__ == "__main__":
+    with Target(URI) as target:
+        target.features.volume.get_wait()
+        for write_timeout in (None, .5):
+            commands, latency = scroll(target, write_timeout)
+            print(f"write_timeout={write_timeout}: {STEPS} remote_set() calls, {commands} commands sent, "
+                f"final value applied {latency*1000:.0f} ms after the last call")
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+import asyncio
+from decimal import Decimal
+from hificon import Target
+
+
+async def print_changes(target):
+    async for f_id, value in target.changes(): print("Changed %s to %s."%(f_id, value))
+
+
+async def main():
+    #target = Target()
+    ## for testing:
+    target = Target("emulate:denon")
+    async with target:
+        await target.wait_for("volume", "power")
+        print("Current volume: %.1f"%await target.features.volume.aget())
+        changes = asyncio.create_task(print_changes(target))
+        await target.features.volume.aset(Decimal(30))
+        await asyncio.sleep(1)
+        changes.cancel()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
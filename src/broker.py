@@ -0,0 +1,20 @@
+import argparse
+from threading import Event
+from . import Target, config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Share one connection to a target with local clients. '
+        'Clients connect with the URI broker:TARGET_URI')
+    parser.add_argument('-t', '--target', metavar="URI", type=str, help='Target URI')
+    parser.add_argument('--socket', metavar="PATH", type=str, help='Unix domain socket path')
+    parser.add_argument('--verbose', '-v', action='count', default=0, help='Verbose mode')
+    args = parser.parse_args()
+    uri = args.target or config.get("Target", "uri").split("?",1)[0]
+    xargs = {k:v for k,v in dict(path=args.socket).items() if v}
+    with Target(uri=f"broker:{uri}", role="server", verbose=args.verbose, **xargs):
+        Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
 from .config import config
 from .transmission import *
+from .target_group import TargetGroup
+from .shared_state import SharedStateWriter, SharedState
+from .value_cache import ValueCache
 
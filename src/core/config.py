@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*- 
 
-import os, configparser, pkgutil, json, yaml
+import os, re, configparser, pkgutil, json, yaml, tempfile
 from collections import UserDict
 from decimal import Decimal
 from copy import deepcopy
@@ -9,6 +9,13 @@ from ..info import PKG_NAME
 
 CONFDIR = os.path.expanduser("~/.%s"%PKG_NAME)
 FILE = os.path.join(CONFDIR, "main.cfg")
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), PKG_NAME)
+
+
+def target_file(directory, kind, uri):
+    """ Returns a path in @directory for a file of type @kind that belongs to the target with @uri """
+    return os.path.join(directory, "%s-%s-%s"%(PKG_NAME, kind, re.sub(r"[^\w.-]+", "_", uri)))
 
 
 def decimal_constructor(loader, node):
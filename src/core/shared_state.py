@@ -0,0 +1,63 @@
+"""
+Publishes the feature values of a connected target in shared memory, so that other local processes
+can read them without an own connection.
+Example:
+    Writer: SharedStateWriter(target)
+    Reader: SharedState("denon://192.168.1.15:23").get("volume")
+    or: Target("shm:denon://192.168.1.15:23")
+"""
+
+import os
+from contextlib import suppress
+from .config import RUNTIME_DIR, target_file, config
+from .util import StateTable
+
+
+__all__ = ["SharedStateWriter", "SharedState", "state_path"]
+
+
+def state_path(uri):
+    """ Returns the default path of the state table for target @uri """
+    return target_file(RUNTIME_DIR, "state", uri)
+
+
+class SharedStateWriter(object):
+    """ Writes the values of @target to the table at @path until close() is called.
+    Values are unset while the target is disconnected. """
+
+    def __init__(self, target, path=None):
+        self.path = path or state_path(target.uri)
+        self._table = StateTable.create(self.path, target.features.keys())
+        self._table.clear()
+        self._binding = target.bind(on_feature_change=self.on_feature_change, on_disconnected=self._table.clear)
+        for f in target.features.loaded():
+            if f.isset(): self.on_feature_change(f.id, f._val)
+
+    def on_feature_change(self, f_id, value):
+        try: self._table.write(f_id, value)
+        except (KeyError, TypeError, ValueError): pass
+
+    def close(self):
+        self._binding.unbind()
+        self._table.clear()
+        self._table.close()
+        with suppress(FileNotFoundError): os.unlink(self.path)
+
+
+class SharedState(object):
+    """ Reads the values that a SharedStateWriter publishes for @uri or at @path """
+
+    def __init__(self, uri=None, path=None):
+        self._table = StateTable.open(path or state_path(uri or config.get("Target", "uri")))
+
+    keys = property(lambda self: self._table.keys)
+
+    def get(self, f_id):
+        """ Returns the value of feature @f_id or None if it is not set """
+        return self._table.read(f_id)
+
+    def sequence(self, f_id):
+        """ Returns a number that changes each time @f_id is being written """
+        return self._table.sequence(f_id)
+
+    def close(self): self._table.close()
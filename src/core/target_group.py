@@ -0,0 +1,125 @@
+"""
+Controls many targets with one asyncio event loop instead of threads per target.
+Example:
+    with TargetGroup(["denon://192.168.1.15:23", "denon://192.168.1.16:23"]) as group:
+        group.set("power", True)
+        print(group.get("volume"))
+        print(group.health())
+"""
+
+import asyncio, time
+from threading import Thread
+from .transmission import features
+
+
+__all__ = ["TargetGroup"]
+
+
+class _Health(object):
+    connects = 0
+    disconnects = 0
+    last_received = None # time.monotonic() of the last received line
+
+
+class TargetGroup(object):
+    """
+    Runs all @targets in one event loop. Use "with" to run the loop in a new thread
+    or "async with" to run the targets in the current loop.
+    Group operations return {target.uri: result}.
+    """
+    _loop = None
+    _thread = None
+
+    def __init__(self, targets=tuple()):
+        self.targets = []
+        self._health = {} # {id(target): _Health}
+        for target in targets: self.add(target)
+
+    def __enter__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+        self.run(self.aenter())
+        return self
+
+    def __exit__(self, *args):
+        self.run(self.aexit())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = None
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        await self.aenter()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aexit()
+        self._loop = None
+
+    async def aenter(self, timeout=features.MAX_CALL_DELAY):
+        """ Enter all targets and wait up to @timeout seconds until they are connected """
+        await asyncio.gather(*map(self._aenter_target, self.targets))
+        deadline = time.monotonic()+timeout
+        while not all(t.connected for t in self.targets) and time.monotonic() < deadline:
+            await asyncio.sleep(.05)
+
+    async def aexit(self): await asyncio.gather(*[t.aexit() for t in self.targets], return_exceptions=True)
+
+    async def _aenter_target(self, target):
+        target._connect_on_enter = False # the target's mainloop connects, so that one unreachable target cannot fail the group
+        await target.aenter()
+
+    def run(self, coro, timeout=None):
+        """ Execute @coro in the group's loop and return the result. Only for "with" """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def add(self, target):
+        """ Add a target object or URI """
+        if isinstance(target, str):
+            from .. import Target
+            target = Target(target)
+        health = self._health[id(target)] = _Health()
+        def on_connect(): health.connects += 1
+        def on_disconnected(): health.disconnects += 1
+        def on_receive_raw_data(data): health.last_received = time.monotonic()
+        target.bind(on_connect=on_connect, on_disconnected=on_disconnected,
+            on_receive_raw_data=on_receive_raw_data)
+        self.targets.append(target)
+        if self._thread: self.run(self._aenter_target(target))
+        elif self._loop: self._loop.create_task(self._aenter_target(target))
+        return target
+
+    async def _gather(self, func):
+        async def call(target):
+            try: return await func(target)
+            except Exception as e: return e
+        results = await asyncio.gather(*map(call, self.targets))
+        return {target.uri: result for target, result in zip(self.targets, results)}
+
+    async def aget(self, f_id):
+        """ Returns {uri: value or exception} """
+        return await self._gather(lambda target: target.features[f_id].aget())
+
+    async def aset(self, f_id, value):
+        """ Set @f_id to @value on all targets in parallel. Returns {uri: True if confirmed or exception} """
+        return await self._gather(lambda target: target.features[f_id].aset(value))
+
+    def get(self, f_id): return self.run(self.aget(f_id))
+
+    def set(self, f_id, value): return self.run(self.aset(f_id, value))
+
+    def health(self):
+        """ Returns {uri: {"connected", "connects", "disconnects", "idle", "backlog", "polls_sent"}}
+        where idle is the number of seconds since the last received line """
+        now = time.monotonic()
+        return {target.uri: dict(
+            connected=target.connected,
+            connects=health.connects,
+            disconnects=health.disconnects,
+            idle=None if health.last_received is None else now-health.last_received,
+            backlog=target.send_backlog(),
+            polls_sent=getattr(target, "polls_sent", 0),
+        ) for target in self.targets for health in [self._health[id(target)]]}
+
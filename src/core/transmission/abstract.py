@@ -3,11 +3,12 @@ The classes AbstractClient and TelnetClient help you to stay synchronised with
 values from a Telnet or non-Telnet server. A client supports features. See features.py.
 """
 
-import sys, re
+import sys, re, time, traceback, asyncio
+from contextlib import contextmanager
 from urllib.parse import parse_qsl
-from threading import Thread, Event
+from threading import Thread, Event, Lock, get_ident, local
 from datetime import datetime, timedelta
-from ..util import log_call, Bindable
+from ..util import log_call, Bindable, PRIORITY_INTERACTIVE, PRIORITY_POLL, PRIORITY_BACKGROUND
 from .types import SchemeType, ServerType, ClientType
 from .discovery import DiscoverySchemeMixin
 from . import features
@@ -20,17 +21,21 @@ class AbstractTarget(Bindable):
     uri = ""
     scheme_id = "[undefined]"
     Scheme = None
+    _dispatcher = features.FeatureDispatcher # finds features by the beginning of received data
+    _pending = features.PendingCalls
+    _batch = None # (thread id, {f_id: (feature, value before batch)}) while on_receive_raw_data_batch() runs
     features = features.Features()
     feature_categories = property(lambda self: self.Scheme.feature_categories)
-    _pending = list
 
     def __init__(self, *args, verbose=0, **xargs):
         self.verbose = verbose
         self.update_uri()
-        self.features = self.features.__class__()
+        self.features = features.LazyFeatures(self, self.Scheme.features)
         self._pending = self._pending()
-        # apply @features to self
-        for F in self.Scheme.features.values(): F(self)
+        self._dispatcher = self._dispatcher()
+        # apply @features to self. Features are being created on first access of target.features
+        for F in self.Scheme.features.values():
+            if not self._dispatcher.add(F): self.features[F.id]
         super().__init__(*args, **xargs)
 
     def __eq__(self, target):
@@ -46,8 +51,46 @@ class AbstractTarget(Bindable):
     
     def exit(self): pass
 
+    async def __aenter__(self): await self.aenter(); return self
+
+    async def __aexit__(self, type, value, tb): await self.aexit()
+
+    async def aenter(self):
+        """ enter() for "async with". Runs enter() in a worker thread unless overridden """
+        await asyncio.to_thread(self.enter)
+
+    async def aexit(self): await asyncio.to_thread(self.exit)
+
+    async def wait_for(self, *features):
+        """ Coroutine. Poll @features and wait until they are set. Returns True if all are set """
+        try: features_ = [self.features[f] if isinstance(f, str) else f for f in features]
+        except KeyError as e:
+            print(f"[{self.__class__.__name__}] Warning: Target does not provide feature. {e}",
+                file=sys.stderr)
+            return False
+        return all(await asyncio.gather(*[f.apoll() for f in features_]))
+
+    async def changes(self):
+        """ Asynchronous iterator that yields (f_id, value) for each on_feature_change event """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        binding = self.bind(on_feature_change=
+            lambda f_id, value: loop.call_soon_threadsafe(queue.put_nowait, (f_id, value)))
+        try:
+            while True: yield await queue.get()
+        finally: binding.unbind()
+
     def update_uri(self, *args): self.uri = ":".join(map(str, [self.scheme_id, *args]))
 
+    def init_feature(self, Feature):
+        """ Called on first access of a feature in self.features """
+        return Feature(self)
+
+    def register_feature(self, f):
+        """ Called by the feature's constructor. Replaces a feature with the same id """
+        self.features.register(f)
+        self._dispatcher.add(f)
+
     def poll_feature(self, f, *args, **xargs):
         """ Called when a feature value is being requested """
         raise NotImplementedError()
@@ -70,7 +113,16 @@ class AbstractTarget(Bindable):
             if self.verbose > 3:
                 print("[%s] Warning: Target does not provide feature required by `%s`: %s"
                 %(self.__class__.__name__, func.__name__, e), file=sys.stderr)
-        else: return features.FunctionCall(self, func, args, kwargs, features_)
+            return
+        for f in features_:
+            if not f.isset(): return features.FunctionCall(self, func, args, kwargs, features_)
+        for f in features_:
+            if f.isstale(): # use the stale value now and revalidate it in the background
+                try: f.async_poll()
+                except ConnectionError: pass
+        # fast path: call directly without registering a FunctionCall
+        try: func(*features_, *args, **kwargs)
+        except ConnectionError: pass
 
     @log_call
     def on_feature_change(self, f_id, value):
@@ -78,13 +130,41 @@ class AbstractTarget(Bindable):
         if f_id and self.verbose > 2:
             print("[%s] $%s = %s"%(self.__class__.__name__,f_id,repr(value)))
         
+    def on_features_change(self, changes):
+        """ Fired once after on_receive_raw_data_batch() with @changes = {f_id: value} """
+        pass
+        
     def send(self, data): raise NotImplementedError()
 
     def on_receive_raw_data(self, data):
         if self.verbose > 4: print(data, file=sys.stderr)
-        consumed = [f.consume(data) for f_id,f in self.features.items() if f.matches(data)]
+        features_ = map(self.features.get, self._dispatcher.candidates(data))
+        consumed = [f.consume(data) for f in features_ if f and f.matches(data)]
         if not consumed: self.features.fallback.consume(data)
 
+    def on_receive_raw_data_batch(self, lines):
+        """ Process all @lines and then call on_change once for each feature whose value differs
+        from the value before the batch """
+        if self._batch: # nested or batch in other thread
+            for data in lines: self.on_receive_raw_data(data)
+            return
+        self._batch = batch = (get_ident(), {})
+        try:
+            for data in lines:
+                try: self.on_receive_raw_data(data)
+                except Exception: traceback.print_exc()
+        finally: self._batch = None
+        changes = {}
+        for f, value in batch[1].values():
+            with f._lock:
+                if f.isset() and f._val != value:
+                    changes[f.id] = f._val
+                    try: f.on_change(f._val)
+                    except Exception: traceback.print_exc()
+        if changes:
+            try: self.on_features_change(changes)
+            except Exception: traceback.print_exc()
+
     def handle_query(self, query):
         for key, val in parse_qsl(query, True):
             if val: # ?fkey=val
@@ -108,15 +188,24 @@ class AttachedClientMixin:
         if self._control_server: self._server.exit()
         super().exit()
 
+    async def aenter(self):
+        if control_server := not self._server.connected: self._server.enter()
+        self._control_server = control_server
+        await super().aenter()
+
+    async def aexit(self):
+        if self._control_server: self._server.exit()
+        await super().aexit()
+
 
 class AbstractServer(ServerType, AbstractTarget):
     init_args_help = None # tuple
 
-    def __init__(self, *args, **xargs):
-        super().__init__(*args, **xargs)
-        for f in self.features.values(): f.init_on_server()
-        for f in self.features.values():
-            not f.id=="fallback" and f.bind(on_change=lambda *_,f=f: self.connected and f.resend())
+    def init_feature(self, Feature):
+        f = super().init_feature(Feature)
+        f.init_on_server()
+        not f.id=="fallback" and f.bind(on_change=lambda *_: self.connected and f.resend())
+        return f
     
     def enter(self): self.connected = True
     def exit(self): self.connected = False
@@ -136,7 +225,7 @@ class AbstractServer(ServerType, AbstractTarget):
     def send(self, data): pass
 
     def on_receive_raw_data(self, data):
-        called_features = [f for f_id, f in self.features.items() if f.call == data]
+        called_features = [self.features[f_id] for f_id in self._dispatcher.called(data)]
         if called_features:
             # data is a request
             for f in called_features:
@@ -178,16 +267,72 @@ class GroupedSet:
 
 class _PreloadMixin:
     preload_features = GroupedSet() # feature ids to be polled constantly when not set
+    sync_rate = 50 # max. requests per second when synchronising preload_features after connecting
     _preload_features_iter = None
+    _sync_counter = 0
 
     def __init__(self, *args, **xargs):
         super().__init__(*args, **xargs)
         self.preload_features = GroupedSet(self.preload_features)
 
+    def on_connect(self):
+        super().on_connect()
+        self._sync_counter += 1
+        self.start_task(self._synchronise(self._sync_counter), name="sync")
+
     def on_disconnected(self):
         super().on_disconnected()
         self._preload_features_iter = None
 
+    def plan_sync(self, f_ids):
+        """ Returns a list of feature groups, one for each distinct call, that cover the unset
+        or stale features in @f_ids in the given order """
+        groups = {}
+        for f_id in f_ids:
+            if (f := self.features.get(f_id)) and (not f.isset() or f.isstale()):
+                groups.setdefault(f.call, []).append(f)
+        return list(groups.values())
+
+    async def _synchronise(self, counter):
+        """ poll preload_features and observed stale features with one request per distinct call
+        and wait for the answers. Stale values that have not been confirmed are being unset.
+        Other stale features are being revalidated when being bound or read with get_wait() or aget(). """
+        groups = self.plan_sync(dict.fromkeys([*self.preload_features,
+            *(f.id for f in self.features.loaded() if f.isstale() and f.isobserved())]))
+        total = sum(map(len, groups))
+        for group in groups:
+            if counter != self._sync_counter or not self.connected: return
+            sent = self.polls_sent
+            try:
+                with self.send_priority(PRIORITY_BACKGROUND):
+                    for f in group: f.async_poll()
+            except ConnectionError: return
+            if self.polls_sent != sent: await asyncio.sleep(1/self.sync_rate)
+        pending = [f for group in groups for f in group]
+        deadline = time.monotonic()+features.MAX_CALL_DELAY
+        done = None
+        while counter == self._sync_counter and self.connected:
+            pending = [f for f in pending if not f.isset() or f.isstale()]
+            if done != (done := total-len(pending)): self.on_sync_progress(done, total)
+            if not pending: break
+            if self.send_backlog(): deadline = time.monotonic()+features.MAX_CALL_DELAY
+            if (remaining := deadline-time.monotonic()) <= 0: break
+            await asyncio.sleep(min(remaining, .1))
+        else: return
+        for f in pending:
+            if f.isstale(): f.unset()
+        self.on_synced(done, total)
+
+    def on_sync_progress(self, done, total):
+        """ Event that is being fired while waiting for answers after connecting """
+        pass
+
+    def on_synced(self, done, total):
+        """ Event that is being fired when the answers to all requests after connecting
+        have been received or timed out. @done of @total features are set """
+        if self.verbose > 1:
+            print("[%s] synchronised %d/%d features"%(self.__class__.__name__, done, total), file=sys.stderr)
+
     def mainloop_hook(self):
         super().mainloop_hook()
         if not self.connected: return
@@ -198,34 +343,60 @@ class _PreloadMixin:
                 self._preload_features_iter = None
                 break
             if (f := self.features.get(f_id)) and not f.isset():
-                try: f.async_poll()
+                try:
+                    with self.send_priority(PRIORITY_BACKGROUND): f.async_poll()
                 except ConnectionError: break
 
 
 class _FeaturesMixin:
+    stale_while_revalidate = False # keep the values as stale when disconnecting instead of unsetting them
     _poll_timeout = dict
+    _polls_in_flight = dict # {call: timeout}, requests that have been sent but not been answered yet
+    _poll_lock = Lock
+    polls_sent = 0 # number of polls that have been sent
+    polls_saved = 0 # number of polls that have not been sent because of a poll with the same call
 
-    def __init__(self, *args, **xargs):
+    def __init__(self, *args, stale_while_revalidate=None, **xargs):
         super().__init__(*args, **xargs)
+        if stale_while_revalidate is not None: self.stale_while_revalidate = stale_while_revalidate
         self._poll_timeout = self._poll_timeout()
+        self._polls_in_flight = self._polls_in_flight()
+        self._poll_lock = self._poll_lock()
 
     def on_disconnected(self):
         super().on_disconnected()
         self._pending.clear()
         self._poll_timeout.clear()
-        for f in self.features.values(): f.unset()
+        self._polls_in_flight.clear()
+        for f in self.features.loaded():
+            if self.stale_while_revalidate and f.call is not None and f.isset(): f.mark_stale()
+            else: f.unset()
     
     def mainloop_hook(self):
         super().mainloop_hook()
-        for p in self._pending: p.check_expiration()
+        for p in self._pending.pop_expired(): p.check_expiration()
 
     def poll_feature(self, f, force=False):
-        """ poll feature value if not polled in same time frame or force is True """
-        if not force and (timeout := self._poll_timeout.get(f.call)) and timeout > datetime.now(): return
-        self._poll_timeout[f.call] = datetime.now()+timedelta(seconds=30)
-        f.poll_on_client()
+        """ poll feature value if not polled in same time frame or force is True.
+        If a request with the same call is still unanswered, wait for it instead of sending again. """
+        now = datetime.now()
+        with self._poll_lock:
+            if not force and (timeout := self._poll_timeout.get(f.call)) and timeout > now: return
+            self._poll_timeout[f.call] = now+timedelta(seconds=30)
+            in_flight = (timeout := self._polls_in_flight.get(f.call)) and timeout > now
+            if in_flight: self.polls_saved += 1
+            elif f.call is not None:
+                self._polls_in_flight[f.call] = now+timedelta(seconds=features.MAX_CALL_DELAY)
+                self.polls_sent += 1
+        try:
+            with self.send_priority(PRIORITY_POLL): f.poll_on_client(send=not in_flight)
+        except ConnectionError:
+            self._polls_in_flight.pop(f.call, None)
+            raise
 
-    def on_receive_feature_value(self, f, value): f.set(value)
+    def on_receive_feature_value(self, f, value):
+        self._polls_in_flight.pop(f.call, None)
+        f.set(value)
 
     def set_feature_value(self, f, value): f.remote_set(value)
 
@@ -242,10 +413,14 @@ class _AbstractClient(ClientType, AbstractTarget):
     _mainloopt = None
     _stoploop = Event
     _connect_on_enter = False
+    _priority = local # priority of send() in the current thread
+    _loop = None # asyncio event loop while entered with "async with"
+    _tasks = None # asyncio tasks while entered with "async with"
 
     def __init__(self, *args, connect=True, **xargs):
         super().__init__(*args, **xargs)
         self._stoploop = self._stoploop()
+        self._priority = self._priority()
         self._connect_on_enter = connect
     
     def enter(self):
@@ -279,6 +454,28 @@ class _AbstractClient(ClientType, AbstractTarget):
     def send(self, cmd):
         if self.verbose > 4: print(f"{self.uri} > ${repr(cmd)}", file=sys.stderr)
 
+    def start_task(self, coro, name):
+        """ Run coroutine @coro in the event loop if entered with "async with", else in a new thread """
+        if self._loop:
+            self._tasks = [t for t in self._tasks if not t.done()]
+            self._tasks.append(self._loop.create_task(coro, name=name))
+        else: Thread(target=asyncio.run, args=(coro,), name=name, daemon=True).start()
+
+    def send_backlog(self):
+        """ Number of commands that have been sent but are still waiting to be transmitted """
+        return 0
+
+    @contextmanager
+    def send_priority(self, priority):
+        """ Commands sent by the current thread inside this context get @priority
+        or the lower priority of an enclosing context """
+        previous = self.get_send_priority()
+        self._priority.value = max(previous, priority)
+        try: yield
+        finally: self._priority.value = previous
+
+    def get_send_priority(self): return getattr(self._priority, "value", PRIORITY_INTERACTIVE)
+
     @log_call
     def on_connect(self):
         """ Execute when connected to server e.g. after connection aborted """
@@ -1,14 +1,16 @@
-import sys, traceback, re, math
-from contextlib import suppress
+import sys, traceback, re, math, itertools, heapq, asyncio
 from decimal import Decimal
-from threading import Event, Lock, Timer, Thread
+from threading import Event, Lock, RLock, Thread, get_ident
 from datetime import datetime, timedelta
-from ..util import call_sequence, Bindable, AttrDict
+from contextlib import suppress
+from ..util import Bindable, AttrDict, PrefixTree, Timer
 from .types import ClientType, ServerType
 
 
 MAX_CALL_DELAY = 2 #seconds, max delay for calling function using "@require"
 
+_create_lock = Lock() # for creating synchronisation objects on first use
+
 
 class FunctionCall(object):
     """ Function call that requires features. Drops call if no connection """
@@ -39,10 +41,9 @@ class FunctionCall(object):
                 self.cancel()
                 return True
 
-    def postpone(self): self._target._pending.append(self)
+    def postpone(self): self._target._pending.add(self)
 
-    def cancel(self):
-        with suppress(ValueError): self._target._pending.remove(self)
+    def cancel(self): self._target._pending.remove(self)
 
     active = property(lambda self: self in self._target._pending)
 
@@ -60,6 +61,65 @@ class FunctionCall(object):
                 %(self.__class__.__name__, self._func.__name__), file=sys.stderr)
 
 
+class PendingCalls(object):
+    """ Table of FunctionCall objects, indexed by the features that they require
+    and by their expiration time """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls = {} # used as ordered set
+        self._by_feature = {} # {feature: {FunctionCall: None}}
+        self._expiration = [] # heap [(timeout, n, FunctionCall)]
+        self._counter = itertools.count()
+
+    def __repr__(self): return repr(list(self._calls))
+
+    def __len__(self): return len(self._calls)
+
+    def __contains__(self, call): return call in self._calls
+
+    def __iter__(self):
+        with self._lock: return iter(list(self._calls))
+
+    def add(self, call):
+        with self._lock:
+            self._calls[call] = None
+            for f in call._features: self._by_feature.setdefault(f, {})[call] = None
+            if call._timeout: heapq.heappush(self._expiration, (call._timeout, next(self._counter), call))
+
+    def remove(self, call):
+        """ remove @call. Entries in the expiration heap are being dropped lazily """
+        with self._lock:
+            if self._calls.pop(call, False) is False: return
+            for f in call._features:
+                if (calls := self._by_feature.get(f)) is None: continue
+                calls.pop(call, None)
+                if not calls: del self._by_feature[f]
+            if len(self._expiration) > 2*len(self._calls)+64:
+                self._expiration = [e for e in self._expiration if e[2] in self._calls]
+                heapq.heapify(self._expiration)
+
+    def clear(self):
+        with self._lock:
+            self._calls.clear()
+            self._by_feature.clear()
+            self._expiration.clear()
+
+    def waiting_for(self, feature):
+        """ returns calls that require @feature in order of creation """
+        with self._lock: return list(self._by_feature.get(feature, ()))
+
+    def pop_expired(self):
+        """ returns calls whose timeout has passed and removes them from the expiration heap """
+        now = datetime.now()
+        expired = []
+        with self._lock:
+            while self._expiration and self._expiration[0][0] < now:
+                call = heapq.heappop(self._expiration)[2]
+                if call in self._calls: expired.append(call)
+        return expired
+
+
 class Features(AttrDict):
     
     def wait_for(self, *features):
@@ -72,12 +132,112 @@ class Features(AttrDict):
         for t in threads: t.start()
         for t in threads: t.join()
         return all([f.isset() for f in features])
-        
+
+
+class LazyFeatures(Features):
+    """ The features of a target. A feature object is being created on first access. """
+
+    def __init__(self, target, classes):
+        dict.__init__(self)
+        self._target = target
+        self._classes = classes # {f_id: Feature class}
+        self._lock = RLock()
+        self._initialising = {} # {f_id: feature or None}, being created by __missing__() and not yet published
+
+    def __getattr__(self, name):
+        if name.startswith("_"): raise AttributeError(name)
+        try: return self[name]
+        except KeyError as e: raise AttributeError(e)
+
+    def __missing__(self, f_id):
+        with self._lock:
+            if dict.__contains__(self, f_id): return dict.__getitem__(self, f_id)
+            if (f := self._initialising.get(f_id)) is not None: return f # accessed by its own initialisation
+            Feature = self._classes[f_id]
+            self._initialising[f_id] = None
+            try:
+                f = self._target.init_feature(Feature)
+                dict.__setitem__(self, f_id, f) # other threads may only see the completely initialised feature
+            finally: self._initialising.pop(f_id, None)
+            return f
+
+    def register(self, f):
+        """ Called by the feature's constructor. Features that are being created by __missing__()
+        are published when init_feature() returns, others immediately """
+        with self._lock:
+            if f.id in self._initialising: self._initialising[f.id] = f
+            else: dict.__setitem__(self, f.id, f)
+
+    def __contains__(self, f_id): return f_id in self._classes or dict.__contains__(self, f_id)
+
+    def __iter__(self): return iter(self.keys())
+
+    def __len__(self): return len(self.keys())
+
+    def get(self, f_id, default=None):
+        try: return self[f_id]
+        except KeyError: return default
+
+    def keys(self): return list(dict.fromkeys((*self._classes, *dict.keys(self))))
+
+    def values(self): return [self[f_id] for f_id in self.keys()]
+
+    def items(self): return [(f_id, self[f_id]) for f_id in self.keys()]
+
+    def loaded(self):
+        """ returns the feature objects that have already been created """
+        return list(dict.values(self))
+
+
+class FeatureDispatcher(object):
+    """ Finds the ids of features that may match a received line by their prefixes or calls.
+    A feature can be added as class and be replaced later by its instance. """
+
+    def __init__(self):
+        self._tree = PrefixTree()
+        self._unindexed = tuple() # features without prefixes, matches() must always be called
+        self._calls = {} # {call: (f_id_1, ..., f_id_n)}
+        self._entries = {} # {f_id: (n, prefixes, call)}
+        self._counter = itertools.count()
+
+    def add(self, f):
+        """ @f: Feature class or instance. Returns False if prefixes or call
+        can only be read on an instance """
+        prefixes, call = f.prefixes, f.call
+        if isinstance(prefixes, property) or isinstance(call, property): return False
+        if old := self._entries.get(f.id): self.remove(f.id)
+        self._entries[f.id] = (old[0] if old else next(self._counter), prefixes, call)
+        if prefixes is None: self._unindexed = (*self._unindexed, f.id)
+        else:
+            for prefix in prefixes: self._tree.add(prefix, f.id)
+        if call is not None: self._calls[call] = (*self._calls.get(call, ()), f.id)
+        return True
+
+    def remove(self, f_id):
+        if (entry := self._entries.pop(f_id, None)) is None: return
+        n, prefixes, call = entry
+        if prefixes is None: self._unindexed = tuple(e for e in self._unindexed if e != f_id)
+        else:
+            for prefix in prefixes: self._tree.remove(prefix, f_id)
+        if call in self._calls:
+            self._calls[call] = tuple(e for e in self._calls[call] if e != f_id)
+            if not self._calls[call]: del self._calls[call]
+
+    def candidates(self, data):
+        """ returns ids of features that might match @data in order of registration """
+        found = dict.fromkeys((*self._tree.find(data), *self._unindexed))
+        return sorted(found, key=lambda f_id: self._entries.get(f_id, (-1,))[0])
+
+    def called(self, data):
+        """ returns ids of features where f.call == @data """
+        return self._calls.get(data, ())
+
 
 class FeatureInterface(object):
     name = "Short description"
     category = "Misc"
     call = None # for retrieval, call target.send(call)
+    prefixes = None # tuple of str. If set, matches() will only be called for data starting with one of them
     default_value = None # if no response from server
     dummy_value = None # for dummy server
     type = object # value data type, e.g. int, bool, str
@@ -136,7 +296,12 @@ class AsyncFeature(FeatureInterface, Bindable, metaclass=_MetaFeature):
     _block_on_remote_set = None
     _block_on_remote_set_resetter = None
     _lock = Lock
-    _event_on_set = Event
+    _event_on_set = None # Event, created on first use
+    write_timeout = None # seconds to wait for the answer to remote_set() before sending the next value. None: no waiting
+    _write_lock = None # Lock, created on first use
+    _write_pending = None # latest serialized value from remote_set() while waiting for the answer
+    _write_timer = None
+    _stale = False # True while the value has not been confirmed by the other side
 
     def __init__(self, target):
         super().__init__()
@@ -145,8 +310,7 @@ class AsyncFeature(FeatureInterface, Bindable, metaclass=_MetaFeature):
             raise TypeError("target must inherit one of %s."%(", ".join(map(lambda c:c.__name__, target_type))))
         self.target = target
         self._lock = self._lock()
-        self._event_on_set = self._event_on_set()
-        target.features[self.id] = self
+        target.register_feature(self)
         
     name = property(lambda self:self.__class__.__name__)
     
@@ -169,7 +333,37 @@ class AsyncFeature(FeatureInterface, Bindable, metaclass=_MetaFeature):
         if not force and not isinstance(value, self.type):
             print("WARNING: Value %s is not of type %s."%(repr(value),self.type.__name__), file=sys.stderr)
         serialized = self.serialize(self.type(value))
-        if not self._blocked(serialized): self._send(serialized)
+        if not self._blocked(serialized): self._write(serialized)
+
+    def _write(self, serialized):
+        """ Send @serialized unless the previous value is still unanswered. In that case it replaces
+        any other waiting value and will be sent after the answer """
+        if self.write_timeout is not None:
+            if self._write_lock is None:
+                with _create_lock:
+                    if self._write_lock is None: self._write_lock = Lock()
+            with self._write_lock:
+                if self._write_timer:
+                    self._write_pending = serialized
+                    return
+                self._write_timer = Timer(self.write_timeout, self._on_write_done)
+                self._write_timer.start()
+        try: self._send(serialized)
+        except:
+            self._on_write_done()
+            raise
+
+    def _on_write_done(self):
+        """ Called when the last written value has been answered or timed out """
+        if self._write_lock is None: return
+        with self._write_lock:
+            if not self._write_timer: return
+            self._write_timer.cancel()
+            self._write_timer = None
+            serialized, self._write_pending = self._write_pending, None
+        if serialized is not None and not (self.isset() and serialized == self.serialize(self._val)):
+            try: self._write(serialized)
+            except ConnectionError: pass
 
     def _send(self, serialized):
         self.on_send()
@@ -185,21 +379,54 @@ class AsyncFeature(FeatureInterface, Bindable, metaclass=_MetaFeature):
         self._block_on_remote_set_resetter.start()
     
     def isset(self): return self._val != None
+
+    def isstale(self):
+        """ True if the value has been restored or kept over a disconnect and not been received since """
+        return self._stale
+
+    def restore(self, value):
+        """ Set @value from an earlier session unless a value is set and mark it as stale.
+        Does not fire on_change, observers receive the value when binding """
+        with self._lock:
+            if self.isset(): return
+            self._val = value
+            self._stale = True
+            self.on_set()
+
+    def mark_stale(self):
+        """ Keep the value but mark it as stale until it is being received again """
+        with self._lock:
+            if self.isset(): self._stale = True
+
+    def isobserved(self):
+        """ True if anything is bound to the value events """
+        return self.has_observers("on_change", "on_set", "on_unset", "on_processed")
+
+    def get_event_on_set(self):
+        """ Returns an Event that is set while the feature is set """
+        if (event := self._event_on_set) is None:
+            with _create_lock:
+                if (event := self._event_on_set) is None:
+                    event = self._event_on_set = Event()
+            if self.isset(): event.set() # in case on_set() has been called before the assignment
+        return event
         
     def unset(self):
         with self._lock:
             self._val = None
+            self._stale = False
             self.on_unset()
         #with suppress(ValueError): self.target._polled.remove(self.call)
 
     def async_poll(self, *args, **xargs): self.target.poll_feature(self, *args, **xargs)
     
-    def poll_on_client(self):
-        """ async_poll() executed on client side """
+    def poll_on_client(self, send=True):
+        """ async_poll() executed on client side.
+        @send: If False, wait for the answer to a request that has already been sent """
         if self.default_value is not None:
             self._timer_set_default = Timer(MAX_CALL_DELAY, self._set_default)
             self._timer_set_default.start()
-        if self.call is not None: self.target.send(self.call)
+        if send and self.call is not None: self.target.send(self.call)
     
     def poll_on_dummy(self):
         if self.dummy_value is not None: val = self.dummy_value
@@ -226,28 +453,33 @@ class AsyncFeature(FeatureInterface, Bindable, metaclass=_MetaFeature):
     
     def _set(self, value):
         assert(value is not None)
+        self._stale = False
         self._prev_val = self._val
         self._val = value
         if not self.isset(): return
-        if self._val != self._prev_val: self.on_change(self._val)
+        if self._write_timer: self._on_write_done()
+        if self._val != self._prev_val:
+            if (batch := self.target._batch) and batch[0] == get_ident(): # defer until batch is complete
+                batch[1].setdefault(self.id, (self, self._prev_val))
+            else: self.on_change(self._val)
         if self._prev_val == None: self.on_set()
         self.on_processed(value)
 
     def bind(self, on_change=None, on_set=None, on_unset=None, on_processed=None, on_send=None):
         """ Register an observer with bind() and call the callback as soon as possible
-        to stay synchronised """
+        to stay synchronised. Returns a handle with an unbind() method """
         with self._lock:
             if self.isset():
                 if on_change: on_change(self.get())
                 if on_set: on_set()
                 if on_processed: on_processed(self.get())
             elif on_unset: on_unset()
-            
-            if on_change: super().bind(on_change = on_change)
-            if on_set: super().bind(on_set = on_set)
-            if on_unset: super().bind(on_unset = on_unset)
-            if on_processed: super().bind(on_processed = on_processed)
-            if on_send: super().bind(on_send = on_send)
+            callbacks = dict(
+                on_change=on_change, on_set=on_set, on_unset=on_unset, on_processed=on_processed, on_send=on_send)
+            binding = super().bind(**{name: callback for name, callback in callbacks.items() if callback})
+        if self.isstale() and self.target.connected: # revalidate the value that the observer has received
+            with suppress(ConnectionError): self.async_poll()
+        return binding
             
     def on_change(self, val):
         """ This event is being called when self.options or the return value of self.get() changes """
@@ -257,19 +489,18 @@ class AsyncFeature(FeatureInterface, Bindable, metaclass=_MetaFeature):
         """ Event is fired on initial set """
         try: self._timer_set_default.cancel()
         except: pass
-        self._event_on_set.set()
+        if self._event_on_set: self._event_on_set.set()
         if getattr(self.target, "_pending", None):
             if self.target.verbose > 5: print("[%s] %d pending functions"
                 %(self.target.__class__.__name__, len(self.target._pending)), file=sys.stderr)
             if self.target.verbose > 6: print("[%s] pending functions: %s"
                 %(self.target.__class__.__name__, self.target._pending), file=sys.stderr)
-            for call in self.target._pending.copy(): # on_feature_set() changes _pending
-                call.on_feature_set(self)
+            for call in self.target._pending.waiting_for(self): call.on_feature_set(self)
         
     def on_unset(self):
         try: self._timer_set_default.cancel()
         except: pass
-        self._event_on_set.clear()
+        if self._event_on_set: self._event_on_set.clear()
     
     def on_processed(self, value):
         """ This event is being called each time the feature is being set to a value
@@ -282,34 +513,87 @@ class AsyncFeature(FeatureInterface, Bindable, metaclass=_MetaFeature):
 
 
 class SynchronousFeature(AsyncFeature):
-
-    def __init__(self,*args,**xargs):
-        self._poll_lock = Lock()
-        super().__init__(*args,**xargs)
+    _poll_lock = None # Lock, created on first use
 
     def get_wait(self):
+        if self._poll_lock is None:
+            with _create_lock:
+                if self._poll_lock is None: self._poll_lock = Lock()
         with self._poll_lock:
+            if self.isstale(): self.wait_poll()
             try: return super().get()
             except ConnectionError:
                 if self.wait_poll(): return super().get()
                 else: raise ConnectionError("Timeout on waiting for answer for %s"%self.__class__.__name__)
 
     def wait_poll(self, force=False):
-        """ Poll and wait if Feature is unset. Returns False on timeout and True otherwise """
+        """ Poll and wait if Feature is unset or stale. Returns False on timeout and True otherwise.
+        A stale value is being kept if the target does not answer """
         if not self.target.connected: return False
         if force: self.unset()
         if not self.isset():
             try: self.async_poll(force)
             except ConnectionError: return False
-            if not self._event_on_set.wait(timeout=MAX_CALL_DELAY+.1): return False
+            if not self.get_event_on_set().wait(timeout=MAX_CALL_DELAY+.1): return False
+        elif self.isstale():
+            received = Event()
+            binding = Bindable.bind(self, on_processed=lambda *_: received.set())
+            try:
+                self.async_poll()
+                received.wait(timeout=MAX_CALL_DELAY+.1)
+            except ConnectionError: pass
+            finally: binding.unbind()
         return True
 
+    async def _await_event(self, event, condition=lambda *args: True, timeout=MAX_CALL_DELAY+.1):
+        """ Wait without blocking the event loop until @event is being fired and @condition(*args) is True """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        def callback(*args):
+            if condition(*args):
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+        binding = self.bind(**{event: callback})
+        try: return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError: return False
+        finally: binding.unbind()
+
+    async def apoll(self, force=False):
+        """ Coroutine version of wait_poll() """
+        if not self.target.connected: return False
+        if force: self.unset()
+        if not self.isset():
+            try: self.async_poll(force)
+            except ConnectionError: return False
+            return await self._await_event("on_set")
+        if self.isstale():
+            received = asyncio.ensure_future(self._await_event("on_processed", lambda *_: not self.isstale()))
+            await asyncio.sleep(0) # bind before polling
+            try: self.async_poll()
+            except ConnectionError: received.cancel()
+            else: await received
+        return True
+
+    async def aget(self):
+        """ Coroutine version of get_wait() """
+        if not await self.apoll():
+            raise ConnectionError("Timeout on waiting for answer for %s"%self.__class__.__name__)
+        return self.get()
+
+    async def aset(self, value, force=False):
+        """ remote_set(@value) and wait until the target reports the new value.
+        Returns False on timeout """
+        processed = asyncio.ensure_future(self._await_event("on_processed", lambda v: v == value))
+        await asyncio.sleep(0) # bind before sending
+        self.remote_set(value, force)
+        return await processed
+
 
 Feature = SynchronousFeature
 
 class NumericFeature(Feature):
     min=0
     max=99
+    write_timeout = .5 # coalesce rapid remote_set() calls, e.g. from a scroll wheel
 
 
 class IntFeature(NumericFeature):
@@ -355,6 +639,7 @@ class PresetValueMixin:
 
 class ConstantValueMixin(PresetValueMixin):
     """ Inerhit if feature value may not change """
+    prefixes = tuple()
     def matches(self,*args,**xargs): return False
     def set(self,*args,**xargs): pass
 
@@ -362,6 +647,7 @@ class ConstantValueMixin(PresetValueMixin):
 class ClientToServerFeatureMixin:
     """ Inheriting features are write only on client and read only on server """
     call = None
+    write_timeout = None # there is no answer to wait for
 
     # for client
     def __init__(self, *args, **xargs):
@@ -413,6 +699,7 @@ class MultipartFeatureMixin:
 
 class OfflineFeatureMixin:
     """ Inherit if the value shall not ever be transmitted """
+    prefixes = tuple()
 
     def matches(self, data): return False
     def remote_set(self, *args, **xargs): raise ValueError("Cannot set value!")
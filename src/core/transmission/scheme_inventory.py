@@ -7,7 +7,9 @@ schemes = {
     "dummyemulate": ".emulate.DummyEmulate",
     "telnet": ".telnet.Telnet",
     "auto": ".auto.Auto",
-    "repeat": ".repeat.Repeat"
+    "repeat": ".repeat.Repeat",
+    "broker": ".broker.Broker",
+    "shm": ".shm.Shm",
 }
 
 
@@ -1,6 +1,10 @@
 import sys
 from .call_sequence import *
 from .function_bind import *
+from .prefix_tree import *
+from .timer import *
+from .send_queue import *
+from .state_table import *
 
 
 def log_call(func):
@@ -7,28 +7,82 @@ Example:
         def on_event(): print(2)
         
     a = A()
-    B(a)
+    b = B(a)
     a.on_event() # output: 1\n2
+    b.unbind()
+    a.on_event() # output: 1
 """
 
 from .call_sequence import *
 
 
+class Observers(object):
+    """ Replaces an event function. Calls the function and then each registered callback.
+    Returns the function's return value. """
+    __slots__ = ("_func", "_callbacks", "_snapshot")
+
+    def __init__(self, func):
+        self._func = func
+        self._callbacks = {} # {Binding: callback}
+        self._snapshot = tuple()
+
+    def __call__(self, *args, **xargs):
+        r = self._func(*args, **xargs)
+        if (callbacks := self._snapshot) is None:
+            callbacks = self._snapshot = tuple(self._callbacks.values())
+        for callback in callbacks: callback(*args, **xargs)
+        return r
+
+    def add(self, binding, callback):
+        self._callbacks[binding] = callback
+        self._snapshot = None
+
+    def remove(self, binding):
+        if self._callbacks.pop(binding, None) is not None: self._snapshot = None
+
+    def __len__(self): return len(self._callbacks)
+
+
+class Binding(object):
+    """ Handle returned by Bindable.bind() """
+    __slots__ = ("_observers",)
+
+    def __init__(self): self._observers = []
+
+    def unbind(self):
+        """ Remove all callbacks that have been registered with this handle """
+        for observers in self._observers: observers.remove(self)
+        self._observers.clear()
+
+
 class Bindable(object):
 
     def bind(self, **callbacks):
         """
         bind(event=function)
         Register callback on @event. Event can be any function in the child class
+        Returns a Binding. Call its unbind() method to remove the callbacks.
         """
+        binding = Binding()
         for name, callback in callbacks.items():
-            setattr(self, name, call_sequence(getattr(self,name), callback))
+            observers = getattr(self, name)
+            if not isinstance(observers, Observers):
+                observers = Observers(observers)
+                setattr(self, name, observers)
+            observers.add(binding, callback)
+            binding._observers.append(observers)
+        return binding
+
+    def has_observers(self, *events):
+        """ True if a callback is bound to any of @events """
+        return any(isinstance(o := self.__dict__.get(e), Observers) and len(o) for e in events)
 
 
 class Autobind(object):
     """ Classes that inherit from this class will automatically have their functions bound
     to @obj. For all functions @obj.f, self.f will be called if it exists each time
-    after @obj.f is being called. """
+    after @obj.f is being called. Call unbind() to stop this. """
+    _binding = None
 
     def __new__(cls, obj, *args, **xargs):
         if not isinstance(obj,Bindable): raise ValueError("obj %s must be of type Bindable"%obj)
@@ -40,6 +94,8 @@ class Autobind(object):
         
     def __init__(self, obj, *args, **xargs):
         events = filter((lambda attr:attr.startswith("on_")), dir(obj))
-        for attr in events: obj.bind(**{attr:getattr(self,attr)})
+        self._binding = obj.bind(**{attr:getattr(self,attr) for attr in events})
         super().__init__(*args,**xargs)
 
+    def unbind(self): self._binding.unbind()
+
@@ -0,0 +1,37 @@
+"""
+Example:
+    t = PrefixTree()
+    t.add("MV", "volume")
+    t.add("MVMAX ", "maxvol")
+    list(t.find("MVMAX 980")) # ["volume", "maxvol"]
+"""
+
+__all__ = ["PrefixTree"]
+
+
+class PrefixTree(object):
+    """ Maps string prefixes to objects. Lookups are lock free because add() and remove() only use
+    single-key dict operations, which are atomic under the GIL, and replace the tuples of objects
+    instead of modifying them. Nodes are modified in place and empty nodes are not being pruned. """
+
+    def __init__(self):
+        self._root = {}
+
+    def add(self, prefix, obj):
+        node = self._root
+        for c in prefix: node = node.setdefault(c, {})
+        node[None] = (*node.get(None, ()), obj)
+
+    def remove(self, prefix, obj):
+        node = self._root
+        for c in prefix:
+            if (node := node.get(c)) is None: return
+        node[None] = tuple(e for e in node.get(None, ()) if e != obj)
+
+    def find(self, s):
+        """ yield all objects whose prefix @s starts with, shortest prefix first """
+        node = self._root
+        yield from node.get(None, ())
+        for c in s:
+            if (node := node.get(c)) is None: return
+            yield from node.get(None, ())
@@ -0,0 +1,99 @@
+"""
+Outgoing messages ordered by priority and paced for devices that need a pause between commands.
+Example:
+    q = SendQueue(interval=.05, burst=3)
+    q.put("MV?", PRIORITY_POLL)
+    q.put("MV50", PRIORITY_INTERACTIVE)
+    q.get() # "MV50"
+"""
+
+import time
+from collections import deque
+from threading import Condition
+
+
+__all__ = ["SendQueue", "PRIORITY_INTERACTIVE", "PRIORITY_POLL", "PRIORITY_BACKGROUND"]
+
+
+PRIORITY_INTERACTIVE = 0 # e.g. remote_set()
+PRIORITY_POLL = 1 # requests for values that are needed now
+PRIORITY_BACKGROUND = 2 # preloading and keepalive
+
+
+class SendQueue(object):
+    """ Priority queue that returns at most @burst items at once and afterwards one item
+    per @interval seconds. Items with the same priority keep their order. """
+    PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_POLL, PRIORITY_BACKGROUND)
+
+    closed = property(lambda self: self._closed)
+
+    def __init__(self, interval=0, burst=1, on_put=None):
+        """ @on_put: function that is being called after each put() and on close() """
+        self.interval = interval
+        self.burst = max(1, burst)
+        self._on_put = on_put
+        self._condition = Condition()
+        self._queues = {p: deque() for p in self.PRIORITIES} # {priority: deque([(time, item)])}
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._closed = False
+        self._sent = dict.fromkeys(self.PRIORITIES, 0)
+        self._wait_total = dict.fromkeys(self.PRIORITIES, 0.)
+        self._wait_max = dict.fromkeys(self.PRIORITIES, 0.)
+
+    def __len__(self): return sum(map(len, self._queues.values()))
+
+    def put(self, item, priority=PRIORITY_INTERACTIVE):
+        with self._condition:
+            self._queues[priority].append((time.monotonic(), item))
+            self._condition.notify()
+        if self._on_put: self._on_put()
+
+    def close(self):
+        """ Drop all items and make get() return None """
+        with self._condition:
+            self._closed = True
+            for q in self._queues.values(): q.clear()
+            self._condition.notify_all()
+        if self._on_put: self._on_put()
+
+    def _refill(self, now):
+        if self.interval <= 0: self._tokens = self.burst
+        else: self._tokens = min(self.burst, self._tokens+(now-self._refilled)/self.interval)
+        self._refilled = now
+
+    def next_delay(self):
+        """ Seconds until get() returns without blocking. None if empty or closed """
+        with self._condition:
+            if self._closed or not len(self): return None
+            self._refill(time.monotonic())
+            return max(0, (1-self._tokens)*self.interval)
+
+    def get(self):
+        """ Block until an item may be sent and return it. Returns None when closed. """
+        with self._condition:
+            while True:
+                if self._closed: return None
+                now = time.monotonic()
+                self._refill(now)
+                if not len(self): self._condition.wait()
+                elif self._tokens < 1: self._condition.wait((1-self._tokens)*self.interval)
+                else: break
+            self._tokens -= 1
+            priority = next(p for p in self.PRIORITIES if self._queues[p])
+            t, item = self._queues[priority].popleft()
+            self._sent[priority] += 1
+            self._wait_total[priority] += now-t
+            self._wait_max[priority] = max(self._wait_max[priority], now-t)
+            return item
+
+    def stats(self):
+        """ Returns {priority: {"depth": n, "sent": n, "wait_mean": s, "wait_max": s}} """
+        with self._condition:
+            return {p: dict(
+                depth=len(self._queues[p]),
+                sent=self._sent[p],
+                wait_mean=self._wait_total[p]/self._sent[p] if self._sent[p] else 0.,
+                wait_max=self._wait_max[p],
+            ) for p in self.PRIORITIES}
+
@@ -0,0 +1,129 @@
+"""
+Table of values in a memory-mapped file with one writing and many reading processes.
+Each key has a fixed slot. A sequence counter per slot lets readers detect concurrent writes without locking.
+Example:
+    table = StateTable.create("/tmp/state", ["volume", "power"])
+    table.write("volume", 50)
+    StateTable.open("/tmp/state").read("volume") # 50
+"""
+
+import os, mmap, struct, json, tempfile
+from decimal import Decimal
+from threading import Lock
+
+
+__all__ = ["StateTable", "encode_value", "decode_value"]
+
+
+_encoders = {bool: "b", int: "i", Decimal: "d", float: "f", str: "s"}
+_decoders = {"b": lambda s: s == "1", "i": int, "d": Decimal, "f": float, "s": str, "j": json.loads}
+
+
+def encode_value(value):
+    """ Returns @value as a str that decode_value() turns into an object of the same type """
+    if (tag := _encoders.get(type(value))) is None: return "j"+json.dumps(value)
+    if tag == "b": return "b1" if value else "b0"
+    return tag+str(value)
+
+
+def decode_value(data): return _decoders[data[0]](data[1:])
+
+
+class StateTable(object):
+    """ Layout: header, @count keys of KEY_SIZE bytes, @count slots of @slot_size bytes.
+    Slot: sequence (odd while being written), length of value or UNSET, encoded value """
+    MAGIC = b"HFST"
+    VERSION = 1
+    KEY_SIZE = 64
+    UNSET = 0xFFFF
+    MAX_RETRIES = 100000 # reads of a slot that is being written before giving up
+    _header = struct.Struct("<4sHII") # magic, version, count, slot size
+    _slot = struct.Struct("<IH") # sequence, length
+
+    def __init__(self, mm, writable=False):
+        self._mmap = mm
+        magic, version, count, self.slot_size = self._header.unpack_from(mm)
+        if magic != self.MAGIC or version != self.VERSION: raise ValueError("Not a state table")
+        keys_offset = self._header.size
+        slots_offset = keys_offset+count*self.KEY_SIZE
+        self._offsets = { # {key: slot offset}
+            bytes(mm[keys_offset+i*self.KEY_SIZE:keys_offset+(i+1)*self.KEY_SIZE]).rstrip(b"\0").decode():
+            slots_offset+i*self.slot_size for i in range(count)}
+        self._write_lock = Lock() if writable else None
+
+    keys = property(lambda self: list(self._offsets))
+
+    @classmethod
+    def open(cls, path):
+        """ Map the table at @path read-only """
+        with open(path, "rb") as fp: return cls(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def create(cls, path, keys, slot_size=128):
+        """ Map the table at @path for writing. The file is being replaced unless it has
+        the same keys and @slot_size so that open readers keep working """
+        keys = sorted(keys)
+        try:
+            with open(path, "r+b") as fp: table = cls(mmap.mmap(fp.fileno(), 0), writable=True)
+        except (OSError, ValueError): pass
+        else:
+            if table.keys == keys and table.slot_size == slot_size: return table
+            table.close()
+        size = cls._header.size+len(keys)*(cls.KEY_SIZE+slot_size)
+        data = bytearray(size)
+        cls._header.pack_into(data, 0, cls.MAGIC, cls.VERSION, len(keys), slot_size)
+        for i, key in enumerate(keys):
+            encoded = key.encode()
+            if len(encoded) > cls.KEY_SIZE: raise ValueError(f"Key too long: {key}")
+            offset = cls._header.size+i*cls.KEY_SIZE
+            data[offset:offset+len(encoded)] = encoded
+        slots_offset = cls._header.size+len(keys)*cls.KEY_SIZE
+        for i in range(len(keys)): cls._slot.pack_into(data, slots_offset+i*slot_size, 0, cls.UNSET)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "wb") as fp: fp.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except:
+            os.unlink(tmp)
+            raise
+        with open(path, "r+b") as fp: return cls(mmap.mmap(fp.fileno(), 0), writable=True)
+
+    def close(self): self._mmap.close()
+
+    def write(self, key, value):
+        """ Store @value or mark @key as unset if @value is None, too large or cannot be encoded """
+        offset = self._offsets[key]
+        try: data = None if value is None else encode_value(value).encode()
+        except (TypeError, ValueError): data = None
+        if data is not None and len(data) > self.slot_size-self._slot.size: data = None
+        with self._write_lock:
+            seq = self._slot.unpack_from(self._mmap, offset)[0]
+            self._slot.pack_into(self._mmap, offset, (seq+1)&0xFFFFFFFF, self.UNSET)
+            if data is not None:
+                start = offset+self._slot.size
+                self._mmap[start:start+len(data)] = data
+            self._slot.pack_into(self._mmap, offset, (seq+2)&0xFFFFFFFF, self.UNSET if data is None else len(data))
+
+    def clear(self):
+        """ Mark all keys as unset """
+        for key in self._offsets: self.write(key, None)
+
+    def sequence(self, key):
+        """ Returns a number that changes with each write to @key """
+        return self._slot.unpack_from(self._mmap, self._offsets[key])[0]
+
+    def read(self, key):
+        """ Returns the value of @key or None if unset. Raises KeyError if the table has no slot for @key """
+        offset = self._offsets[key]
+        mm = self._mmap
+        for _ in range(self.MAX_RETRIES):
+            seq, length = self._slot.unpack_from(mm, offset)
+            if seq & 1: continue # being written
+            if length != self.UNSET:
+                start = offset+self._slot.size
+                data = mm[start:start+length]
+            if self._slot.unpack_from(mm, offset)[0] == seq: break
+        else: return None # writer died while writing
+        if length == self.UNSET: return None
+        return decode_value(data.decode())
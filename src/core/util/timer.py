@@ -0,0 +1,81 @@
+"""
+Timers that share a single thread per process instead of starting one thread per timer.
+Example:
+    t = Timer(1, print, ("Hello",))
+    t.start()
+    t.cancel()
+"""
+
+import heapq, itertools, time, traceback, sys
+from threading import Thread, Condition
+
+
+__all__ = ["TimerScheduler", "Timer"]
+
+
+class TimerScheduler(object):
+    """ Executes functions at given times in one daemon thread.
+    Functions should return quickly because they delay all following timers. """
+    _thread = None
+
+    def __init__(self, name="TimerScheduler"):
+        self._name = name
+        self._condition = Condition()
+        self._heap = [] # [(time, n, Timer)]
+        self._counter = itertools.count()
+
+    def __len__(self): return len(self._heap)
+
+    def add(self, timer):
+        with self._condition:
+            heapq.heappush(self._heap, (timer._time, next(self._counter), timer))
+            if not self._thread:
+                self._thread = Thread(target=self.mainloop, name=self._name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def mainloop(self):
+        while True:
+            with self._condition:
+                while True:
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    t, n, timer = self._heap[0]
+                    if timer.cancelled: heapq.heappop(self._heap)
+                    elif (delay := t-time.monotonic()) > 0: self._condition.wait(delay)
+                    else:
+                        heapq.heappop(self._heap)
+                        break
+            timer._run()
+
+
+scheduler = TimerScheduler()
+
+
+class Timer(object):
+    """ Has the same interface as threading.Timer but is being run by @scheduler """
+    cancelled = False
+    finished = False
+    _time = None
+
+    def __init__(self, interval, function, args=None, kwargs=None, scheduler=scheduler):
+        self.interval = interval
+        self.function = function
+        self.args = args if args is not None else []
+        self.kwargs = kwargs if kwargs is not None else {}
+        self._scheduler = scheduler
+
+    def start(self):
+        if self._time is not None: raise RuntimeError("timers can only be started once")
+        self._time = time.monotonic()+self.interval
+        self._scheduler.add(self)
+
+    def cancel(self): self.cancelled = True
+
+    def is_alive(self): return self._time is not None and not self.finished and not self.cancelled
+
+    def _run(self):
+        try: self.function(*self.args, **self.kwargs)
+        except Exception: print(traceback.format_exc(), file=sys.stderr)
+        finally: self.finished = True
@@ -0,0 +1,77 @@
+"""
+Keeps the last known feature values of a target on disk, so that they are available right after
+the next start while the target revalidates them.
+Example:
+    target = Target(uri)
+    ValueCache(target) # restores the values as stale
+    with target: ...
+"""
+
+import os, json, tempfile
+from threading import Lock
+from .config import CACHE_DIR, target_file
+from .util import Timer, encode_value, decode_value
+
+
+__all__ = ["ValueCache", "cache_path"]
+
+
+def cache_path(uri):
+    """ Returns the default path of the value cache for target @uri """
+    return "%s.json"%target_file(CACHE_DIR, "values", uri)
+
+
+class ValueCache(object):
+    """ Restores the saved values of @target as stale values and saves each change.
+    Changes are being written at most once per @write_delay seconds and when the target exits. """
+    write_delay = 5
+
+    def __init__(self, target, path=None):
+        self.target = target
+        self.path = path or cache_path(target.uri)
+        self._lock = Lock()
+        self._timer = None
+        try:
+            with open(self.path) as fp: self._values = json.load(fp) # {f_id: encoded value}
+        except (OSError, ValueError): self._values = {}
+        self.restore()
+        self._binding = target.bind(on_feature_change=self.on_feature_change, exit=self.flush)
+
+    def restore(self):
+        """ Set all unset features to their saved values and mark them as stale """
+        for f_id, data in list(self._values.items()):
+            if (f := self.target.features.get(f_id)) is None: continue
+            try: f.restore(decode_value(data))
+            except (ValueError, KeyError, ArithmeticError): pass
+
+    def on_feature_change(self, f_id, value):
+        f = self.target.features.get(f_id) if f_id else None
+        if f is None or f.call is None: return # not transmitted
+        try: data = encode_value(value)
+        except TypeError: return
+        with self._lock:
+            if self._values.get(f_id) == data: return
+            self._values[f_id] = data
+            if self._timer: return
+            self._timer = Timer(self.write_delay, self.flush)
+            self._timer.start()
+
+    def flush(self):
+        """ Write all changes now """
+        with self._lock:
+            if not self._timer: return # nothing changed
+            self._timer.cancel()
+            self._timer = None
+            data = json.dumps(self._values, separators=(",", ":"))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        try:
+            with os.fdopen(fd, "w") as fp: fp.write(data)
+            os.replace(tmp, self.path)
+        except:
+            os.unlink(tmp)
+            raise
+
+    def close(self):
+        self._binding.unbind()
+        self.flush()
@@ -0,0 +1,107 @@
+"""
+Shares one connection to a target with local processes over a Unix domain socket.
+Start the broker with hificon_broker -t URI and use Target("broker:URI") in the clients.
+"""
+
+import os, socket, asyncio, sys
+from contextlib import suppress
+from .. import get_scheme
+from ..core.config import RUNTIME_DIR, target_file
+from ..core.transmission.telnet import _AsyncTelnetServer
+from .repeat import Repeat, ClientRepeaterMixin
+
+
+def socket_path(uri):
+    """ Returns the default path of the broker's socket for target @uri """
+    return "%s.sock"%target_file(RUNTIME_DIR, "broker", uri)
+
+
+class _BrokerService(_AsyncTelnetServer):
+    """ Listens on the Unix domain socket @listen_host. Each new connection receives the
+    target's state_dump() first """
+
+    path = property(lambda self: self._address[0])
+
+    def _create_socket(self):
+        with suppress(OSError), socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(self.path)
+            raise RuntimeError(f"A broker is already listening on {self.path}")
+        with suppress(FileNotFoundError): os.unlink(self.path)
+        sock = socket.socket(socket.AF_UNIX)
+        sock.bind(self.path)
+        os.chmod(self.path, 0o600)
+        sock.listen(100)
+        print("[%s] Listening on %s"%(self.__class__.__name__, self.path), file=sys.stderr)
+        return sock
+
+    def exit(self):
+        super().exit()
+        with suppress(FileNotFoundError): os.unlink(self.path)
+
+    async def _connection(self, reader, writer):
+        writer.write("".join(f"{line}{self._break}" for line in self.target.state_dump()).encode("ascii"))
+        await super()._connection(reader, writer)
+
+
+class BrokerServerMixin(ClientRepeaterMixin):
+    """ Repeater that answers requests from its cache and listens on a Unix domain socket """
+    _Service = _AsyncService = _BrokerService
+
+    def __init__(self, target, path, *args, **xargs):
+        super().__init__(target, path, *args, caching=True, **xargs)
+
+    path = property(lambda self: self._server.path)
+
+
+class UnixClientMixin:
+    """ Client that connects to a broker's Unix domain socket """
+    path = None
+
+    def __init__(self, path, *args, **xargs):
+        super().__init__(None, *args, **xargs)
+        self.path = path
+
+    def _open_socket(self):
+        sock = socket.socket(socket.AF_UNIX)
+        sock.settimeout(2)
+        try: sock.connect(self.path)
+        except:
+            sock.close()
+            raise
+        return sock
+
+    async def _aopen_connection(self): return await asyncio.open_unix_connection(self.path)
+
+
+class Broker(Repeat):
+    title = "Broker"
+    description = "Shares one connection to a target with local clients"
+    server_args_help = ("TARGET_URI",)
+    client_args_help = ("TARGET_URI",)
+
+    @classmethod
+    def _get_broker_scheme(cls, Scheme):
+        class BrokerScheme(Scheme):
+            """ Scheme whose client connects to the broker """
+            send_interval = 0 # the broker paces the lines to the target
+            _pulse = None
+            Client = type("Client", (UnixClientMixin, Scheme.Client), {})
+        return BrokerScheme
+
+    @classmethod
+    def new_client(cls, scheme, *args, path=None, **xargs):
+        """ @path: Socket path, default: socket_path(URI) """
+        target = get_scheme(scheme).new_client(*args, connect=False) # for finding the scheme and URI
+        client = cls._get_broker_scheme(target.Scheme).new_client(path or socket_path(target.uri), **xargs)
+        client.uri = f"{cls.scheme_id}:{target.uri}"
+        return client
+
+    @classmethod
+    def new_server(cls, scheme, *args, path=None, **xargs):
+        """ @path: Socket path, default: socket_path(URI) """
+        target = get_scheme(scheme).new_client(*args, connect=False)
+        Server = type("Broker", (BrokerServerMixin, target.Server), {})
+        return cls._new_target(Server)(target, path or socket_path(target.uri), **xargs)
+
+    @classmethod
+    def new_dummyserver(cls, *args, **xargs): raise NotImplementedError()
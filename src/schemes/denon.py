@@ -151,6 +151,8 @@ Category = type("Category", tuple(), dict(
 class Denon(TelnetScheme):
     description = "Denon/Marantz AVR compatible (tested with Denon X1400H)"
     _pulse = "CV?" # workaround for denon to retrieve CV?
+    send_interval = .05 # documented minimal interval between two commands
+    send_burst = 1 # no lines without pause
     
     @classmethod
     def new_client_by_ssdp(cls, response, *args, **xargs):
@@ -172,6 +174,7 @@ class Denon(TelnetScheme):
             function=_function
             matches = lambda self, data: (matches(data) if matches else super().matches(data))
         _Feature.__name__ = _function
+        if matches: _Feature.prefixes = None
         f = _Feature(self)
         f.wait_poll(force=True)
         return "%s%s"%(_function, f.get())
@@ -179,11 +182,20 @@ class Denon(TelnetScheme):
     def send(self, cmd): super().send(cmd.upper() if cmd == cmd.lower() else cmd)
 
 
+class _ClassProperty:
+    """ Like property but can also be read on the class """
+
+    def __init__(self, fget): self.fget = fget
+
+    def __get__(self, obj, cls=None): return self.fget(cls if obj is None else obj)
+
+
 class DenonFeature:
     """ Handles Denon format "@function@value" """
     
     function = None #str, Denon function command
-    call = property(lambda self: "%s?"%self.function)
+    call = _ClassProperty(lambda self: "%s?"%self.function)
+    prefixes = _ClassProperty(lambda self: (self.function,))
     
     def serialize(self, value):
         return "%s%s"%(self.function, self.serialize_val(value))
@@ -1150,8 +1162,8 @@ for cat_code, cat_id, cat_name, l in EQ_OPTIONS:
                 def __init__(self, *args, cat_id=cat_id, sp_id=sp_id, **xargs):
                     super().__init__(*args, **xargs)
                     self._channels = self.target.features.equalizer_channels
-                    self._channels.bind(on_change = self.update)
                     self._speaker_eq = self.target.features[f"eq_{cat_id}_{sp_id}"]
+                    self._channels.bind(on_change = self.update)
                     self._speaker_eq.bind(on_change = self.update)
                 
                 def update(self, val, cat_name=cat_name, bound=bound):
@@ -4,6 +4,7 @@ Dry software run that emulates a target of another scheme
 
 from threading import Thread
 from .. import get_scheme
+from ..core.util import SendQueue
 from ..core.transmission import AbstractScheme
 from ..core.transmission.abstract import AbstractClient, AbstractServer
 
@@ -30,24 +31,41 @@ class Emulate(AbstractScheme):
 
 
 class DummyClientMixin:
-    """ This client skips connection related methods """
+    """ This client skips connection related methods. Messages are being delivered in order by
+    one worker thread per direction, so that send() does not block """
+    _to_server = None # SendQueue while connected
+    _to_client = None
 
     def __init__(self, *args, **xargs):
         super().__init__(*args, **xargs)
-        self._server.bind(send = self._newthread(self.on_receive_raw_data))
-        self.bind(send = self._newthread(self._server.on_receive_raw_data))
-
-    def _newthread(self, func):
-        # send() shall not block for avoiding deadlocks
-        return lambda *args, **kwargs: \
-            Thread(target=func, args=args, kwargs=kwargs, name="transmission", daemon=True).start()
+        self._server.bind(send = lambda data: self._put(self._to_client, data))
+        self.bind(send = lambda data: self._put(self._to_server, data))
+
+    def _put(self, queue, data):
+        if queue is not None: queue.put(data)
+
+    def _start_delivery(self, target):
+        """ Returns a SendQueue whose items are passed to @target.on_receive_raw_data_batch() """
+        queue = SendQueue()
+        def deliver():
+            while (data := queue.get()) is not None:
+                lines = [data]
+                while len(queue) and (data := queue.get()) is not None: lines.append(data)
+                target.on_receive_raw_data_batch(lines)
+        Thread(target=deliver, name="transmission", daemon=True).start()
+        return queue
 
     def connect(self):
         super().connect()
+        self._to_server = self._start_delivery(self._server)
+        self._to_client = self._start_delivery(self)
         self.on_connect()
 
     def disconnect(self):
         super().disconnect()
+        for queue in (self._to_server, self._to_client):
+            if queue is not None: queue.close()
+        self._to_server = self._to_client = None
         self.on_disconnected()
 
     def mainloop(self):
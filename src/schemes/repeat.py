@@ -3,9 +3,13 @@ from .. import get_scheme
 
 
 class ClientRepeaterMixin:
+    """ Server that forwards all data between its clients and @target.
+    @caching: Answer requests from @target's feature values instead of forwarding them """
     _client = None
+    cache_hits = 0 # requests answered from the cache
     
-    def __init__(self, target, *args, **xargs):
+    def __init__(self, target, *args, caching=False, **xargs):
+        self.caching = caching
         self._client = target
         self._client.preload_features = self._client.features.keys()
         self._client.bind(on_receive_raw_data = lambda data:self.send(data))
@@ -24,9 +28,31 @@ class ClientRepeaterMixin:
         self._client.exit()
 
     def on_receive_raw_data(self, data):
+        if self.caching and self._answer_from_cache(data): return
         try: self._client.send(data)
         except ConnectionError as e: print(repr(e))
 
+    def _answer_from_cache(self, data):
+        """ If @data is a request for features that are set on the client, send their values
+        like resend() does and return True """
+        features = [self._client.features[f_id] for f_id in self._client._dispatcher.called(data)]
+        values = [f._val for f in features]
+        if not features or None in values: return False
+        for f, value in zip(features, values):
+            for line in self._serialize(f, value): self.send(line)
+        self.cache_hits += 1
+        return True
+
+    def _serialize(self, f, value):
+        """ Returns the lines that @f sends for @value """
+        serialized = f.serialize(value)
+        return [serialized] if isinstance(serialized, str) else serialized
+
+    def state_dump(self):
+        """ Returns the lines that transmit all values that are set on the client """
+        return [line for f in self._client.features.values() if f.call and f.isset()
+            for line in self._serialize(f, f._val)]
+
 
 class Repeat(Emulate):
     title = "Repeater"
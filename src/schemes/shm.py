@@ -0,0 +1,83 @@
+"""
+Read-only client for the values that another process publishes with SharedStateWriter
+"""
+
+from .. import get_scheme
+from ..core import AbstractScheme
+from ..core.shared_state import SharedState, state_path
+from ..core.transmission.abstract import AbstractClient
+
+
+class SharedStateClientMixin:
+    """ Client that reads the values from a state table instead of a connection """
+    refresh_interval = .1 # seconds between two checks for changed values
+    _state = None
+
+    def __init__(self, path, *args, **xargs):
+        super().__init__(*args, **xargs)
+        self.path = path
+        self._sequences = {} # {f_id: sequence of the last read value}
+
+    def connect(self):
+        super().connect()
+        if self.connected: return
+        try: self._state = SharedState(path=self.path)
+        except (OSError, ValueError) as e: raise ConnectionError(e)
+        self._sequences.clear()
+        self.on_connect()
+
+    def disconnect(self):
+        super().disconnect()
+        if self.connected: self.on_disconnected()
+
+    def on_disconnected(self):
+        super().on_disconnected()
+        if self._state: self._state.close()
+        self._state = None
+
+    def send(self, data):
+        super().send(data)
+        raise ValueError("Read-only target")
+
+    def poll_feature(self, f, *args, **xargs):
+        if not self.connected: raise BrokenPipeError("Not connected")
+        self._update(f)
+
+    def _update(self, f):
+        """ Apply the value of @f from the table if it has been written since the last call """
+        try: sequence = self._state.sequence(f.id)
+        except KeyError: return
+        if self._sequences.get(f.id) == sequence: return
+        self._sequences[f.id] = sequence
+        value = self._state.get(f.id)
+        if value is not None: f.set(value)
+        elif f.isset(): f.unset()
+
+    def mainloop_hook(self):
+        super().mainloop_hook()
+        if not self.connected:
+            try: self.connect()
+            except ConnectionError: return self._stoploop.wait(3)
+        try:
+            for f in self.features.loaded(): self._update(f)
+        except (AttributeError, ValueError): pass # disconnected meanwhile
+        self._stoploop.wait(self.refresh_interval)
+
+
+class Shm(AbstractScheme):
+    title = "Shared Memory"
+    description = "Reads the values that another local program publishes"
+    client_args_help = ("TARGET_URI",)
+
+    @classmethod
+    def new_client(cls, scheme, *args, path=None, **xargs):
+        """ @path: Table path, default: state_path(URI) """
+        target = get_scheme(scheme).new_client(*args, connect=False) # for finding the scheme and URI
+        class SharedStateScheme(target.Scheme):
+            Client = type("Client", (SharedStateClientMixin, AbstractClient), {})
+        client = SharedStateScheme.new_client(path or state_path(target.uri), **xargs)
+        client.uri = f"{cls.scheme_id}:{target.uri}"
+        return client
+
+    @classmethod
+    def new_server(cls, *args, **xargs): raise NotImplementedError()
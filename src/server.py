@@ -7,9 +7,11 @@ def main():
     parser.add_argument('-t', '--target', metavar="URI", type=str, help='Target URI')
     parser.add_argument('--listen-host', metavar="HOST", type=str, help='Host (listening)')
     parser.add_argument('--listen-port', metavar="PORT", type=int, help='Port (listening)')
+    parser.add_argument('--asyncio', action='store_true', help='Serve clients with asyncio instead of a selector thread. Only worth it with hundreds of clients')
     parser.add_argument('--verbose', '-v', action='count', default=0, help='Verbose mode')
     args = parser.parse_args()
     xargs = {k:v for k,v in dict(listen_host=args.listen_host, listen_port=args.listen_port).items() if v}
+    if args.asyncio: xargs["use_asyncio"] = True
     with Target(uri=args.target, role="server", verbose=args.verbose+1, **xargs) as server:
         while True: server.send(input())
 
@@ -3,7 +3,9 @@ gi.require_version('Notify', '0.7')
 from gi.repository import GLib, Gtk, GObject, Notify, Gdk
 from contextlib import AbstractContextManager
 from ..core.transmission import features
-from ..core.config import YamlConfig
+from ..core.config import YamlConfig, config as main_config
+from ..core.shared_state import SharedStateWriter
+from ..core.value_cache import ValueCache
 from ..core.util import Bindable
 from ..core.util.autostart import Autostart
 from ..core.target_controller import TargetController
@@ -27,6 +29,9 @@ class _TargetApp(TargetController, AbstractContextManager):
 
     def __init__(self, uri, *args, **xargs):
         self.target = Target(uri, connect=False, verbose=xargs.get("verbose", 0))
+        self.target.stale_while_revalidate = main_config.getboolean("Target", "stale_while_revalidate")
+        if main_config.getboolean("Target", "value_cache"): ValueCache(self.target)
+        if main_config.getboolean("Target", "shared_state"): SharedStateWriter(self.target)
         super().__init__(self.target, *args, **xargs)
 
     def __enter__(self):
@@ -1,7 +1,7 @@
 from gi.repository import Gtk
 import sys
-from threading import Timer
 from ..core import features
+from ..core.util import Timer
 from .common import config, resolve_feature_id, gtk, GladeGtk, APP_NAME, Singleton, TargetApp, NotificationBase, Notification
 from .tray import TrayMixin
 from .key_binding import KeyBinding
@@ -1,5 +1,5 @@
-from threading import Timer, Lock
-from ..core.util import log_call
+from threading import Lock
+from ..core.util import log_call, Timer
 from ..core.target_controller import TargetController
 from .common import config, TargetApp, Notification
 